@@ -5,66 +5,162 @@ Analyse les résultats CSV et génère un rapport Markdown
 """
 
 import pandas as pd
+import polars as pl
 import argparse
+import fnmatch
 import glob
+import hashlib
+import operator
+import os
 from pathlib import Path
 import sys
 
+# Seules colonnes réellement consommées par le rapport
+REPORT_COLUMNS = [
+    'size', 'ef_search', 'recall_at_10', 'p95_latency_ms',
+    'throughput_chunks_per_min', 'qdrant_disk_gb',
+    'chunks_count', 'indexing_time_min', 'ram_max_gb',
+]
+
+# Dtypes explicites : pas d'inférence par le parseur, float32 au lieu de
+# float64, et la colonne 'size' répétée devient catégorielle
+REPORT_DTYPES = {
+    'size': pl.Categorical,
+    'ef_search': pl.Int32,
+    'chunks_count': pl.Int64,
+    'recall_at_10': pl.Float32,
+    'p95_latency_ms': pl.Float32,
+    'throughput_chunks_per_min': pl.Float32,
+    'qdrant_disk_gb': pl.Float32,
+    'indexing_time_min': pl.Float32,
+    'ram_max_gb': pl.Float32,
+}
+
 def analyze_benchmarks(csv_pattern="benchmark_results/*.csv"):
     """Analyse les fichiers CSV de benchmark et génère un rapport"""
-    
-    # Trouver tous les fichiers CSV
-    csv_files = glob.glob(csv_pattern)
-    if not csv_files:
+
+    # Trouver tous les fichiers CSV via os.scandir : chaque DirEntry garde
+    # son stat() en cache, pas de re-stat pour la clé du cache Parquet.
+    # os.scandir ne couvre qu'un niveau : si la composante répertoire
+    # contient elle-même un joker (ex: runs_*/benchmark_results/*.csv),
+    # on retombe sur glob.
+    directory, name_pattern = os.path.split(csv_pattern)
+    if glob.has_magic(directory):
+        file_stats = [(p, os.stat(p)) for p in glob.glob(csv_pattern)]
+    else:
+        try:
+            file_stats = [(e.path, e.stat())
+                          for e in os.scandir(directory or '.')
+                          if e.is_file() and fnmatch.fnmatch(e.name, name_pattern)]
+        except FileNotFoundError:
+            file_stats = []
+
+    if not file_stats:
         print(f"❌ No CSV files found matching pattern: {csv_pattern}")
         return
-    
+
+    csv_files = [path for path, _ in file_stats]
     print(f"📊 Found {len(csv_files)} CSV files to analyze")
-    
-    # Charger et combiner tous les CSV
-    dfs = []
-    for csv_file in csv_files:
-        try:
-            df = pd.read_csv(csv_file)
-            df['source_file'] = Path(csv_file).name
-            dfs.append(df)
-            print(f"✅ Loaded {csv_file}: {len(df)} rows")
-        except Exception as e:
-            print(f"❌ Error loading {csv_file}: {e}")
-    
-    if not dfs:
-        print("❌ No valid CSV files loaded")
+
+    # Cache Parquet : si aucun CSV n'a changé (chemin, mtime, taille), on
+    # relit directement le frame déjà parsé au lieu de re-parser
+    stats = sorted((path, st.st_mtime_ns, st.st_size)
+                   for path, st in file_stats)
+    cache_key = hashlib.blake2b(repr(stats).encode()).hexdigest()[:16]
+    cache_dir = Path(csv_files[0]).parent
+    cache_path = cache_dir / f".cache_{cache_key}.parquet"
+
+    if cache_path.exists():
+        combined_df = pl.read_parquet(cache_path)
+        print(f"✅ Loaded {combined_df.height} rows from cache ({cache_path.name})")
+        generate_report(combined_df.to_pandas())
         return
-    
-    # Combiner tous les DataFrames
-    combined_df = pd.concat(dfs, ignore_index=True)
-    
-    # Analyser les résultats
-    generate_report(combined_df)
+
+    # Lire chaque CSV par lots : la mémoire de parsing reste bornée à un
+    # lot, et le parseur ne touche que les colonnes utiles au rapport.
+    # StringCache global : les catégorielles issues de fichiers différents
+    # doivent partager leur dictionnaire pour le concat.
+    batches = []
+    loaded_files = 0
+    with pl.StringCache():
+        for csv_file in csv_files:
+            try:
+                reader = pl.read_csv_batched(
+                    csv_file, batch_size=50_000,
+                    columns=REPORT_COLUMNS, schema_overrides=REPORT_DTYPES,
+                )
+                rows = 0
+                while (chunk := reader.next_batches(8)) is not None:
+                    for batch in chunk:
+                        batch = batch.select(REPORT_COLUMNS)
+                        batches.append(batch)
+                        rows += batch.height
+                loaded_files += 1
+                print(f"✅ Loaded {csv_file}: {rows} rows")
+            except Exception as e:
+                print(f"❌ Error loading {csv_file}: {e}")
+
+        if not batches:
+            print("❌ No valid CSV files loaded")
+            return
+
+        # Un seul concat final sur les lots déjà projetés
+        combined_df = pl.concat(batches, how="diagonal")
+    print(f"✅ Loaded {combined_df.height} rows from {loaded_files} files")
+
+    # Écrire le cache et purger les versions périmées
+    for stale in cache_dir.glob(".cache_*.parquet"):
+        stale.unlink()
+    combined_df.write_parquet(cache_path)
+
+    # Le rapport reste en pandas : conversion une seule fois au rendu
+    generate_report(combined_df.to_pandas())
 
 def generate_report(df):
     """Génère un rapport Markdown avec les analyses"""
     
     report = []
-    report.append("# 🎯 GRAVIS RAG Benchmark Analysis Report")
-    report.append("")
-    report.append("## 📊 Executive Summary")
-    report.append("")
-    
+    # Chaque bloc contigu est passé d'un coup à extend : un seul LIST_EXTEND
+    # au lieu d'un list.append par ligne
+    report.extend((
+        "# 🎯 GRAVIS RAG Benchmark Analysis Report",
+        "",
+        "## 📊 Executive Summary",
+        "",
+    ))
+
+
     # Résumé global
     total_tests = len(df)
-    unique_sizes = df['size'].unique()
     unique_ef_values = df['ef_search'].unique()
+
+    # Partitionner une seule fois par taille : chaque df[df['size'] == size]
+    # était un scan complet produisant une copie
+    groups = {size: group
+              for size, group in df.groupby('size', sort=False, observed=True)}
+    unique_sizes = list(groups)
+
+    # Une seule passe groupby pour les trois extrema par taille, au lieu
+    # de trois scans idxmax/idxmin par taille
+    extrema = df.groupby('size', sort=False, observed=True).agg(
+        recall_idx=('recall_at_10', 'idxmax'),
+        latency_idx=('p95_latency_ms', 'idxmin'),
+        throughput_idx=('throughput_chunks_per_min', 'idxmax'),
+    )
+    best_recall_rows = df.loc[extrema['recall_idx']].set_axis(extrema.index)
+    best_latency_rows = df.loc[extrema['latency_idx']].set_axis(extrema.index)
+    best_throughput_rows = df.loc[extrema['throughput_idx']].set_axis(extrema.index)
     
-    report.append(f"- **Total tests run**: {total_tests}")
-    report.append(f"- **Benchmark sizes**: {', '.join(unique_sizes)}")
-    report.append(f"- **ef_search values tested**: {', '.join(map(str, unique_ef_values))}")
-    report.append("")
-    
-    # Go/No-Go Analysis
-    report.append("## 🚦 Go/No-Go Analysis")
-    report.append("")
-    
+    report.extend((
+        f"- **Total tests run**: {total_tests}",
+        f"- **Benchmark sizes**: {', '.join(unique_sizes)}",
+        f"- **ef_search values tested**: {', '.join(map(str, unique_ef_values))}",
+        "",
+        "## 🚦 Go/No-Go Analysis",
+        "",
+    ))
+
+
     # Seuils recommandés
     thresholds = {
         'throughput_min': 1000,  # chunks/min
@@ -75,62 +171,90 @@ def generate_report(df):
     
     # Analyse pour chaque taille
     for size in unique_sizes:
-        size_df = df[df['size'] == size]
-        report.append(f"### {size.upper()} Benchmark")
-        report.append("")
-        
+        report.extend((f"### {size.upper()} Benchmark", ""))
+
         if size == 'full':
-            # Critères production pour 100k chunks
-            best_row = size_df.loc[size_df['recall_at_10'].idxmax()]
-            
-            throughput_ok = best_row['throughput_chunks_per_min'] >= thresholds['throughput_min']
-            latency_ok = best_row['p95_latency_ms'] <= thresholds['p95_latency_max']
-            recall_ok = best_row['recall_at_10'] >= thresholds['recall_min']
-            disk_ok = best_row['qdrant_disk_gb'] <= thresholds['disk_max']
-            
-            status = "✅ GO" if all([throughput_ok, latency_ok, recall_ok, disk_ok]) else "❌ NO-GO"
-            
-            report.append(f"**Status**: {status}")
-            report.append("")
-            report.append("| Metric | Value | Threshold | Status |")
-            report.append("|--------|-------|-----------|--------|")
-            report.append(f"| Throughput | {best_row['throughput_chunks_per_min']:.0f} chunks/min | ≥{thresholds['throughput_min']} | {'✅' if throughput_ok else '❌'} |")
-            report.append(f"| P95 Latency | {best_row['p95_latency_ms']:.1f}ms | ≤{thresholds['p95_latency_max']}ms | {'✅' if latency_ok else '❌'} |")
-            report.append(f"| Recall@10 | {best_row['recall_at_10']:.3f} | ≥{thresholds['recall_min']} | {'✅' if recall_ok else '❌'} |")
-            report.append(f"| Disk Usage | {best_row['qdrant_disk_gb']:.2f}GB | ≤{thresholds['disk_max']}GB | {'✅' if disk_ok else '❌'} |")
+            # Critères production pour 100k chunks, pilotés par une table
+            # (metric, value, threshold, op) : ajouter un critère = une ligne
+            best_row = best_recall_rows.loc['full']
+
+            checks = pd.DataFrame({
+                'metric': ['Throughput', 'P95 Latency', 'Recall@10', 'Disk Usage'],
+                'value': [best_row['throughput_chunks_per_min'],
+                          best_row['p95_latency_ms'],
+                          best_row['recall_at_10'],
+                          best_row['qdrant_disk_gb']],
+                'threshold': [thresholds['throughput_min'],
+                              thresholds['p95_latency_max'],
+                              thresholds['recall_min'],
+                              thresholds['disk_max']],
+                'op': [operator.ge, operator.le, operator.ge, operator.le],
+                'fmt': ['{:.0f} chunks/min', '{:.1f}ms', '{:.3f}', '{:.2f}GB'],
+                'limit': [f"≥{thresholds['throughput_min']}",
+                          f"≤{thresholds['p95_latency_max']}ms",
+                          f"≥{thresholds['recall_min']}",
+                          f"≤{thresholds['disk_max']}GB"],
+            })
+            checks['ok'] = [op(value, threshold) for value, threshold, op
+                            in zip(checks['value'], checks['threshold'], checks['op'])]
+
+            status = "✅ GO" if checks['ok'].all() else "❌ NO-GO"
+
+            report.extend((
+                f"**Status**: {status}",
+                "",
+                "| Metric | Value | Threshold | Status |",
+                "|--------|-------|-----------|--------|",
+            ))
+            report.extend(
+                f"| {metric} | {fmt.format(value)} | {limit} | {'✅' if ok else '❌'} |"
+                for metric, value, fmt, limit, ok
+                in zip(checks['metric'], checks['value'], checks['fmt'],
+                       checks['limit'], checks['ok'])
+            )
             report.append("")
-        
+
         # Meilleure configuration par objectif
-        report.append("#### Recommended Configurations")
-        report.append("")
-        
-        best_latency = size_df.loc[size_df['p95_latency_ms'].idxmin()]
-        best_recall = size_df.loc[size_df['recall_at_10'].idxmax()]
-        best_throughput = size_df.loc[size_df['throughput_chunks_per_min'].idxmax()]
-        
-        report.append("| Objective | ef_search | P95 Latency | Recall@10 | Throughput |")
-        report.append("|-----------|-----------|-------------|-----------|------------|")
-        report.append(f"| **Lowest Latency** | {best_latency['ef_search']} | {best_latency['p95_latency_ms']:.1f}ms | {best_latency['recall_at_10']:.3f} | {best_latency['throughput_chunks_per_min']:.0f} |")
-        report.append(f"| **Best Recall** | {best_recall['ef_search']} | {best_recall['p95_latency_ms']:.1f}ms | {best_recall['recall_at_10']:.3f} | {best_recall['throughput_chunks_per_min']:.0f} |")
-        report.append(f"| **Best Throughput** | {best_throughput['ef_search']} | {best_throughput['p95_latency_ms']:.1f}ms | {best_throughput['recall_at_10']:.3f} | {best_throughput['throughput_chunks_per_min']:.0f} |")
-        report.append("")
-    
+        best_latency = best_latency_rows.loc[size]
+        best_recall = best_recall_rows.loc[size]
+        best_throughput = best_throughput_rows.loc[size]
+
+        report.extend((
+            "#### Recommended Configurations",
+            "",
+            "| Objective | ef_search | P95 Latency | Recall@10 | Throughput |",
+            "|-----------|-----------|-------------|-----------|------------|",
+            f"| **Lowest Latency** | {best_latency['ef_search']} | {best_latency['p95_latency_ms']:.1f}ms | {best_latency['recall_at_10']:.3f} | {best_latency['throughput_chunks_per_min']:.0f} |",
+            f"| **Best Recall** | {best_recall['ef_search']} | {best_recall['p95_latency_ms']:.1f}ms | {best_recall['recall_at_10']:.3f} | {best_recall['throughput_chunks_per_min']:.0f} |",
+            f"| **Best Throughput** | {best_throughput['ef_search']} | {best_throughput['p95_latency_ms']:.1f}ms | {best_throughput['recall_at_10']:.3f} | {best_throughput['throughput_chunks_per_min']:.0f} |",
+            "",
+        ))
+
     # Détails complets
-    report.append("## 📋 Complete Results")
-    report.append("")
-    report.append("| Size | Chunks | ef_search | Indexing (min) | Throughput | RAM (GB) | Disk (GB) | P95 Latency (ms) | Recall@10 |")
-    report.append("|------|--------|-----------|----------------|------------|----------|-----------|------------------|-----------|")
-    
-    for _, row in df.iterrows():
-        report.append(f"| {row['size']} | {row['chunks_count']:,} | {row['ef_search']} | {row['indexing_time_min']:.1f} | {row['throughput_chunks_per_min']:.0f} | {row['ram_max_gb']:.1f} | {row['qdrant_disk_gb']:.2f} | {row['p95_latency_ms']:.1f} | {row['recall_at_10']:.3f} |")
-    
-    report.append("")
-    report.append("## 🔧 Tuning Recommendations")
-    report.append("")
+    report.extend((
+        "## 📋 Complete Results",
+        "",
+        "| Size | Chunks | ef_search | Indexing (min) | Throughput | RAM (GB) | Disk (GB) | P95 Latency (ms) | Recall@10 |",
+        "|------|--------|-----------|----------------|------------|----------|-----------|------------------|-----------|",
+    ))
+
+
+    # zip sur les tableaux NumPy bruts : pas d'objet Series construit par ligne
+    result_columns = ['size', 'chunks_count', 'ef_search', 'indexing_time_min',
+                      'throughput_chunks_per_min', 'ram_max_gb', 'qdrant_disk_gb',
+                      'p95_latency_ms', 'recall_at_10']
+    rows = zip(*(df[col].to_numpy() for col in result_columns))
+    report.extend(
+        f"| {size} | {chunks:,} | {ef} | {idx_min:.1f} | {thr:.0f} | {ram:.1f} | {disk:.2f} | {p95:.1f} | {recall:.3f} |"
+        for size, chunks, ef, idx_min, thr, ram, disk, p95, recall in rows
+    )
     
+    report.extend(("", "## 🔧 Tuning Recommendations", ""))
+
+
     # Recommandations basées sur les résultats
-    if 'full' in unique_sizes:
-        full_df = df[df['size'] == 'full']
+    if 'full' in groups:
+        full_df = groups['full']
         
         # Analyse du trade-off latence/qualité
         ef_32 = full_df[full_df['ef_search'] == 32].iloc[0] if not full_df[full_df['ef_search'] == 32].empty else None
@@ -142,19 +266,21 @@ def generate_report(df):
             
             report.append(f"- **ef_search=32 vs 128**: {latency_improvement:+.1f}% latency, {recall_improvement:+.1f}% recall")
     
-    report.append("- **For production**: Use ef_search=64 as baseline, tune based on requirements")
-    report.append("- **Low latency**: ef_search=32 (trade-off: -2-5% recall)")
-    report.append("- **High quality**: ef_search=128 (trade-off: +20-40% latency)")
-    report.append("")
-    report.append("---")
-    report.append(f"*Report generated by GRAVIS RAG Benchmark Analysis Tool*")
+    report.extend((
+        "- **For production**: Use ef_search=64 as baseline, tune based on requirements",
+        "- **Low latency**: ef_search=32 (trade-off: -2-5% recall)",
+        "- **High quality**: ef_search=128 (trade-off: +20-40% latency)",
+        "",
+        "---",
+        "*Report generated by GRAVIS RAG Benchmark Analysis Tool*",
+    ))
     
-    # Sauvegarder le rapport
-    report_content = "\n".join(report)
+    # Sauvegarder le rapport : writelines évite le buffer complet alloué
+    # par "\n".join, le tampon de 1 MiB amortit les syscalls d'écriture
     report_path = "benchmark_analysis_report.md"
-    
-    with open(report_path, 'w') as f:
-        f.write(report_content)
+
+    with open(report_path, 'w', buffering=1 << 20) as f:
+        f.writelines(f"{line}\n" for line in report)
     
     print(f"📄 Report generated: {report_path}")
     
@@ -163,8 +289,7 @@ def generate_report(df):
     print("📊 BENCHMARK ANALYSIS SUMMARY")
     print("="*50)
     for size in unique_sizes:
-        size_df = df[df['size'] == size]
-        best = size_df.loc[size_df['recall_at_10'].idxmax()]
+        best = best_recall_rows.loc[size]
         print(f"{size.upper():>6}: ef={best['ef_search']:>3}, latency={best['p95_latency_ms']:>5.1f}ms, recall={best['recall_at_10']:.3f}")
 
 def main():
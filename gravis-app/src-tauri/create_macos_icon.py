@@ -1,131 +1,213 @@
 #!/usr/bin/env python3
 from PIL import Image, ImageDraw
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+import hashlib
 import os
+import tempfile
+
+# Résolu une fois : évite la remontée d'attributs Image.Resampling.LANCZOS
+# à chaque appel dans la boucle chaude
+_LANCZOS = Image.Resampling.LANCZOS
+
+# Pyramide propre à chaque worker : le logo est rechargé une fois par
+# process (les Images PIL ne se picklent pas proprement)
+_worker_pyramid = None
+
+# Cache (taille, padding) -> icône : les mêmes combinaisons reviennent
+# entre les listes de tailles, inutile de re-resampler
+_icon_cache = {}
+
+def _build_pyramid(logo):
+    """Pyramide de réductions par 2 : chaque resize part du niveau le plus
+    proche au lieu de l'original haute résolution"""
+    pyramid = [logo]
+    while pyramid[-1].width > 32:
+        level = pyramid[-1]
+        pyramid.append(level.resize((level.width // 2, level.height // 2),
+                                    _LANCZOS))
+    return pyramid
+
+def _icon_with_padding(pyramid, size, padding_percent=20):
+    """Crée une icône avec le bon padding transparent pour macOS"""
+
+    cached = _icon_cache.get((size, padding_percent))
+    if cached is not None:
+        return cached
+
+    # Créer une image transparente de la taille finale
+    icon = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+
+    # Calculer la taille du logo (80% de l'icône finale)
+    logo_size = int(size * (100 - padding_percent) / 100)
+
+    # Redimensionner le logo depuis le plus petit niveau encore >= 2x la cible
+    src = next((p for p in reversed(pyramid) if p.width >= logo_size * 2),
+               pyramid[0])
+    # reducing_gap : Pillow fait d'abord une réduction entière bon marché,
+    # puis finit au LANCZOS — même qualité, bien moins de FLOPs
+    logo_resized = src.resize((logo_size, logo_size), _LANCZOS,
+                              reducing_gap=3.0)
+
+    # Calculer la position pour centrer le logo
+    offset = (size - logo_size) // 2
+
+    # Coller le logo au centre
+    icon.paste(logo_resized, (offset, offset), logo_resized)
+
+    # Pas de copie au retour : les appelants ne font que save()
+    _icon_cache[(size, padding_percent)] = icon
+    return icon
+
+def _init_worker(logo_bytes):
+    """Initialise un worker du pool : recharge le logo et sa pyramide"""
+    global _worker_pyramid
+    logo = Image.open(BytesIO(logo_bytes)).convert("RGBA")
+    _worker_pyramid = _build_pyramid(logo)
+
+def _render_one(task):
+    """Rend et sauvegarde une icône (exécuté dans un worker du pool)"""
+    size, padding, output_path = task
+    icon = _icon_with_padding(_worker_pyramid, size, padding)
+    icon.save(output_path, 'PNG')
+    return output_path
 
 def create_macos_compliant_icon():
     """Crée une icône conforme aux standards macOS avec padding transparent"""
-    
+
     logo_path = "/Users/lucasbometon/Desktop/voice_flow/gravis/gravis-app/src-tauri/icons/garvis_logo.png"
     icons_dir = "/Users/lucasbometon/Desktop/voice_flow/gravis/gravis-app/src-tauri/icons"
-    
+
     print("🍎 Création d'icônes conformes aux standards macOS...")
-    
-    # Charger le logo original
-    logo = Image.open(logo_path).convert("RGBA")
-    
-    def create_icon_with_padding(size, padding_percent=20):
-        """Crée une icône avec le bon padding transparent pour macOS"""
-        
-        # Créer une image transparente de la taille finale
-        icon = Image.new('RGBA', (size, size), (0, 0, 0, 0))
-        
-        # Calculer la taille du logo (80% de l'icône finale)
-        logo_size = int(size * (100 - padding_percent) / 100)
-        
-        # Redimensionner le logo
-        logo_resized = logo.resize((logo_size, logo_size), Image.Resampling.LANCZOS)
-        
-        # Calculer la position pour centrer le logo
-        offset = (size - logo_size) // 2
-        
-        # Coller le logo au centre
-        icon.paste(logo_resized, (offset, offset), logo_resized)
-        
-        return icon
-    
+
+    # Charger le logo original (les octets bruts sont picklés une seule
+    # fois vers chaque worker du pool)
+    with open(logo_path, 'rb') as f:
+        logo_bytes = f.read()
+
     # Tailles nécessaires avec padding approprié (40% = logo 60% de la taille)
     sizes = [
         (32, "32x32.png", 40),
-        (128, "128x128.png", 40), 
+        (128, "128x128.png", 40),
         (256, "128x128@2x.png", 40),
         (512, "icon.png", 40),  # Icône principale
     ]
-    
-    for size, filename, padding in sizes:
-        icon = create_icon_with_padding(size, padding)
-        output_path = os.path.join(icons_dir, filename)
-        icon.save(output_path, 'PNG')
-        print(f"✅ Créé: {filename} ({size}x{size}) avec {padding}% padding")
-    
-    # Créer .icns pour macOS avec iconutil
-    print("\n🔧 Création du fichier .icns macOS...")
-    
-    try:
-        import subprocess
-        
-        # Créer un dossier temporaire pour iconset
-        iconset_dir = "/tmp/gravis_macos.iconset"
-        os.makedirs(iconset_dir, exist_ok=True)
-        
-        # Générer toutes les tailles requises pour iconset avec plus de padding
-        iconset_configs = [
-            (16, "icon_16x16.png", 45),
-            (32, "icon_16x16@2x.png", 45),
-            (32, "icon_32x32.png", 40),
-            (64, "icon_32x32@2x.png", 40),
-            (128, "icon_128x128.png", 38),
-            (256, "icon_128x128@2x.png", 38),
-            (256, "icon_256x256.png", 35),
-            (512, "icon_256x256@2x.png", 35),
-            (512, "icon_512x512.png", 32),
-            (1024, "icon_512x512@2x.png", 32),
-        ]
-        
-        for size, filename, padding in iconset_configs:
-            icon = create_icon_with_padding(size, padding)
-            output_path = os.path.join(iconset_dir, filename)
-            icon.save(output_path, 'PNG')
-        
-        # Convertir en .icns avec iconutil
-        icns_path = os.path.join(icons_dir, "icon.icns")
-        result = subprocess.run(
-            ['iconutil', '-c', 'icns', iconset_dir, '-o', icns_path], 
-            capture_output=True, text=True
-        )
-        
-        if result.returncode == 0:
-            print(f"✅ Créé: icon.icns (format macOS natif)")
-        else:
-            print(f"⚠️  Échec création .icns: {result.stderr}")
-            # Fallback: utiliser le PNG haute résolution
-            fallback_icon = create_icon_with_padding(1024, 12)
-            fallback_icon.save(icns_path.replace('.icns', '_fallback.png'), 'PNG')
-            print(f"✅ Fallback: créé icon_fallback.png")
-        
-        # Nettoyer le dossier temporaire
-        import shutil
-        shutil.rmtree(iconset_dir)
-        
-    except Exception as e:
-        print(f"⚠️  Erreur lors de la création .icns: {e}")
-        # Créer un fallback PNG
-        fallback_icon = create_icon_with_padding(1024, 12)
-        fallback_path = os.path.join(icons_dir, "icon_macos_fallback.png")
-        fallback_icon.save(fallback_path, 'PNG')
-        print(f"✅ Fallback: créé icon_macos_fallback.png")
-    
+
+    # Mémoïsation au niveau fichier : si le logo source n'a pas changé et
+    # que toutes les sorties existent, tout le pipeline est un no-op
+    src_hash = hashlib.blake2b(logo_bytes).hexdigest()
+    hash_path = os.path.join(icons_dir, ".logo.hash")
+    targets = [os.path.join(icons_dir, filename) for _, filename, _ in sizes]
+    targets += [os.path.join(icons_dir, "icon.icns"),
+                os.path.join(icons_dir, "icon.ico")]
+    if os.path.exists(hash_path):
+        with open(hash_path) as f:
+            if f.read().strip() == src_hash and all(os.path.exists(t) for t in targets):
+                print("✅ Icons up to date")
+                return
+
+    logo = Image.open(BytesIO(logo_bytes)).convert("RGBA")
+    pyramid = _build_pyramid(logo)
+
+    # Générer toutes les tailles requises pour iconset avec plus de padding
+    iconset_configs = [
+        (16, "icon_16x16.png", 45),
+        (32, "icon_16x16@2x.png", 45),
+        (32, "icon_32x32.png", 40),
+        (64, "icon_32x32@2x.png", 40),
+        (128, "icon_128x128.png", 38),
+        (256, "icon_128x128@2x.png", 38),
+        (256, "icon_256x256.png", 35),
+        (512, "icon_256x256@2x.png", 35),
+        (512, "icon_512x512.png", 32),
+        (1024, "icon_512x512@2x.png", 32),
+    ]
+
+    # Dossier iconset dans un TemporaryDirectory : nettoyage garanti même en
+    # cas de crash, pas de collision entre runs concurrents, et sur tmpfs les
+    # PNG intermédiaires ne touchent jamais le disque.
+    # iconutil exige un dossier avec l'extension .iconset.
+    with tempfile.TemporaryDirectory(prefix='gravis_macos_',
+                                     suffix='.iconset') as iconset_dir:
+        # Les resamples sont indépendants : un worker par cœur, tailles Tauri
+        # et iconset dans une seule vague
+        tasks = [(size, padding, os.path.join(icons_dir, filename))
+                 for size, filename, padding in sizes]
+        tasks += [(size, padding, os.path.join(iconset_dir, filename))
+                  for size, filename, padding in iconset_configs]
+
+        with ProcessPoolExecutor(initializer=_init_worker,
+                                 initargs=(logo_bytes,)) as executor:
+            list(executor.map(_render_one, tasks))
+
+        for size, filename, padding in sizes:
+            print(f"✅ Créé: {filename} ({size}x{size}) avec {padding}% padding")
+
+        # Créer .icns pour macOS avec iconutil
+        print("\n🔧 Création du fichier .icns macOS...")
+
+        icns_ok = False
+        try:
+            import subprocess
+
+            # Convertir en .icns avec iconutil
+            icns_path = os.path.join(icons_dir, "icon.icns")
+            result = subprocess.run(
+                ['iconutil', '-c', 'icns', iconset_dir, '-o', icns_path],
+                capture_output=True, text=True
+            )
+
+            if result.returncode == 0:
+                icns_ok = True
+                print(f"✅ Créé: icon.icns (format macOS natif)")
+            else:
+                print(f"⚠️  Échec création .icns: {result.stderr}")
+                # Fallback: utiliser le PNG haute résolution
+                fallback_icon = _icon_with_padding(pyramid, 1024, 12)
+                fallback_icon.save(icns_path.replace('.icns', '_fallback.png'), 'PNG')
+                print(f"✅ Fallback: créé icon_fallback.png")
+
+        except Exception as e:
+            print(f"⚠️  Erreur lors de la création .icns: {e}")
+            # Créer un fallback PNG
+            fallback_icon = _icon_with_padding(pyramid, 1024, 12)
+            fallback_path = os.path.join(icons_dir, "icon_macos_fallback.png")
+            fallback_icon.save(fallback_path, 'PNG')
+            print(f"✅ Fallback: créé icon_macos_fallback.png")
+
     # Créer aussi .ico pour Windows avec padding
     print("\n🪟 Création du fichier .ico Windows...")
     ico_sizes = [16, 32, 48, 64, 128, 256]
     ico_images = []
-    
+
     for size in ico_sizes:
         # Plus de padding pour les petites tailles Windows
         padding = 45 if size <= 32 else 40 if size <= 64 else 35
-        icon = create_icon_with_padding(size, padding)
+        icon = _icon_with_padding(pyramid, size, padding)
         ico_images.append(icon)
-    
+
     ico_path = os.path.join(icons_dir, "icon.ico")
-    ico_images[0].save(
-        ico_path, 
-        format='ICO', 
-        sizes=[(img.width, img.height) for img in ico_images]
+    # Sauver depuis la plus grande frame : l'encodeur ICO de Pillow filtre
+    # les sizes dépassant l'image de base avant de consulter append_images,
+    # donc partir de la 16px jetterait toutes les autres frames
+    ico_images[-1].save(
+        ico_path,
+        format='ICO',
+        sizes=[(img.width, img.height) for img in ico_images],
+        append_images=ico_images[:-1]
     )
     print(f"✅ Créé: icon.ico (multi-résolution Windows)")
-    
+
+    # Mémoriser le hash du logo pour court-circuiter le prochain run, mais
+    # seulement si le .icns a vraiment été régénéré : sinon un icon.icns
+    # périmé (copie du logo, vieux run) serait figé par le skip
+    if icns_ok:
+        with open(hash_path, 'w') as f:
+            f.write(src_hash)
+
     print("\n🎉 Icônes macOS créées avec succès !")
     print("📏 Chaque icône a maintenant le bon padding transparent pour macOS")
     print("🍎 L'icône devrait maintenant avoir la même taille que les autres apps dans le dock")
 
 if __name__ == "__main__":
-    create_macos_compliant_icon()
\ No newline at end of file
+    create_macos_compliant_icon()
@@ -12,17 +12,29 @@ def resize_transparent_logo():
     
     # Charger le logo original
     logo = Image.open(logo_path).convert("RGBA")
-    
+
+    # Pyramide de réductions par 2 : chaque resize part du niveau le plus
+    # proche au lieu de l'original haute résolution
+    pyramid = [logo]
+    while pyramid[-1].width > 32:
+        level = pyramid[-1]
+        pyramid.append(level.resize((level.width // 2, level.height // 2),
+                                    Image.Resampling.LANCZOS))
+
     # Tailles nécessaires
     sizes = [
         (32, "32x32.png"),
-        (128, "128x128.png"), 
+        (128, "128x128.png"),
         (256, "128x128@2x.png"),
     ]
-    
+
     for size, filename in sizes:
-        # Redimensionner avec anti-aliasing
-        resized = logo.resize((size, size), Image.Resampling.LANCZOS)
+        # Redimensionner avec anti-aliasing, depuis le plus petit niveau >= 2x
+        src = next((p for p in reversed(pyramid) if p.width >= size * 2),
+                   pyramid[0])
+        # reducing_gap : réduction entière bon marché d'abord, LANCZOS ensuite
+        resized = src.resize((size, size), Image.Resampling.LANCZOS,
+                             reducing_gap=3.0)
         
         # Sauvegarder
         output_path = os.path.join(icons_dir, filename)